@@ -0,0 +1,242 @@
+# Benchmarks of the hot paths of amazons27_part2, on a fixed set of positions.
+#
+#   python bench.py [-o results.json] [-s seconds] [--search-time seconds]
+#
+# Each benchmark runs on each position of CORPUS in a fresh python process,
+# so its peak memory (ru_maxrss, in KB) is its own. A benchmark repeats its
+# work until it has taken at least -s seconds and reports a rate:
+#  * movegen: BitBoard.moves for the side to move, in moves/sec
+#  * eval: evaluate, and the two functions it replaced (heuristic and
+#    heu2, kept here for the comparison), each in evals/sec
+#  * count_areas: Board.count_areas from scratch, in calls/sec
+#  * update: Amazons.update on legal moves (each taken back after), in
+#    moves/sec
+#  * search: one mcs116 call with a time limit of --search-time, in nodes/sec
+#    (with the opening book and the endgame solver off, so it always
+#    searches)
+#  * endgame: the exact endgame solver from an empty memo -- endgame_counts
+#    when the sides are walled off, split_regions (which solves the groups
+#    of queens and regions nothing else touches) otherwise -- in solves/sec;
+#    solved is the number of groups solved each time, and a position with
+#    none is not timed
+# The results go to stdout (or -o) as one JSON document, with the commit and
+# the python version, so runs on different commits can be compared.
+
+import argparse, json, os, platform, resource, subprocess, sys, tempfile, time
+
+import amazons27_part2
+from amazons27_part2 import Amazons, Board, BitBoard, evaluate, iter_bits, popcount
+
+# 10x10 positions, row 0 first; white to move in all of them
+CORPUS = {
+    'opening': [
+        '...Q..Q...',
+        '..........',
+        '..........',
+        'Q........Q',
+        '..........',
+        '..........',
+        'q........q',
+        '..........',
+        '..........',
+        '...q..q...',
+    ],
+    # 20 random plies in
+    'midgame': [
+        '......x.q.',
+        '.......x..',
+        '....xxx.x.',
+        'xq.xx..x.x',
+        '....x...Q.',
+        '...Q..x...',
+        'q...Q.....',
+        '...xxQx..x',
+        '......x...',
+        '..x.xq....',
+    ],
+    # 56 random plies in: every region belongs to one side
+    'late': [
+        'x.x...xxq.',
+        'xx.xx..xx.',
+        '.x..xxx.x.',
+        'x.xxxqxxxx',
+        'q..xxxx.Qx',
+        'xxxxQ.xx.x',
+        '.x..x.....',
+        'xQxxx.x..x',
+        'xxx.xxxx..',
+        'qxxxx..Qxx',
+    ],
+}
+
+BENCHMARKS = ['movegen', 'eval', 'count_areas', 'update', 'search', 'endgame']
+
+def load(name):
+    rows = CORPUS[name]
+    board = Board(len(rows), [], [])
+    board.config = [list(row) for row in rows]
+    board.init_regions()
+    return board
+
+# call work() until min_time has passed; returns (calls, seconds)
+def repeat(work, min_time):
+    calls = 0
+    start = time.time()
+    while True:
+        work()
+        calls += 1
+        elapsed = time.time() - start
+        if elapsed >= min_time:
+            return (calls, elapsed)
+
+def bench_movegen(board, args):
+    bb = BitBoard.from_board(board)
+    moves = len(list(bb.moves(bb.bWhite)))
+    (calls, elapsed) = repeat(lambda: list(bb.moves(bb.bWhite)), args.seconds)
+    return {'moves': moves, 'seconds': elapsed, 'moves_per_sec': calls*moves/elapsed}
+
+# the mobility of queens with each direction's ray cut to a mask of squares
+def clipped_mobility(bb, queens, clips):
+    empty = bb.empty()
+    count = 0
+    for (d, clip) in zip(bb.dirs, clips):
+        out = 0
+        s = queens
+        while True:
+            s = (d > 0 and s << d or s >> -d) & empty
+            if not s:
+                break
+            out |= s
+        count += popcount(out & clip)
+    return count
+
+# the two evaluations the search used before evaluate: the mobility of the
+# white queens, with the up, right and up-right rays stopping at row 6,
+# column 6 and row 5 (the bounds of the original loops), and the mobility of
+# all but the last two black queens
+def heuristic(bb):
+    rows6 = ((1 << (6*bb.stride)) - 1) & bb.full
+    rows5 = ((1 << (5*bb.stride)) - 1) & bb.full
+    cols6 = sum([((1 << min(6, bb.size)) - 1) << (r*bb.stride) for r in range(bb.size)])
+    return clipped_mobility(bb, bb.white, (rows6, cols6, bb.full, bb.full, bb.full, rows5, bb.full, bb.full))
+
+def heu2(bb):
+    return bb.mobility(sum(list(iter_bits(bb.black))[:-2]))
+
+def bench_eval(board, args):
+    bb = BitBoard.from_board(board)
+    result = {}
+    for (name, work) in [('evaluate', lambda: evaluate(bb, bb.bWhite)),
+                         ('heuristic', lambda: heuristic(bb)), ('heu2', lambda: heu2(bb))]:
+        (calls, elapsed) = repeat(work, args.seconds)
+        result[name + '_per_sec'] = calls/elapsed
+    result['score'] = evaluate(bb, bb.bWhite)
+    return result
+
+def bench_count_areas(board, args):
+    (calls, elapsed) = repeat(board.count_areas, args.seconds)
+    return {'seconds': elapsed, 'calls_per_sec': calls/elapsed}
+
+def bench_update(board, args):
+    (fd, setup) = tempfile.mkstemp(suffix='.txt')
+    os.write(fd, "%d\n%d\nhuman\n\nhuman\n\n" % (args.search_time, len(board.config)))
+    os.close(fd)
+    game = Amazons(setup)
+    os.remove(setup)
+    game.board = board
+    bb = BitBoard.from_board(board)
+    moves = [tuple(map(bb.rc, m)) for m in bb.moves(bb.bWhite)]
+    def work():
+        for m in moves:
+            game.update(m)
+            board.unmake_move(m)
+    (calls, elapsed) = repeat(work, args.seconds)
+    return {'moves': len(moves), 'seconds': elapsed, 'moves_per_sec': calls*len(moves)/elapsed}
+
+def bench_search(board, args):
+    amazons27_part2.USE_ENDGAME = False
+    board.time_limit = args.search_time
+    start = time.time()
+    move = amazons27_part2.mcs116(board)
+    elapsed = time.time() - start
+    nodes = sum(amazons27_part2.stats.nodes.values())
+    return {'move': move, 'depth': amazons27_part2.stats.depth, 'nodes': nodes,
+            'seconds': elapsed, 'nodes_per_sec': nodes/elapsed}
+
+def bench_endgame(board, args):
+    bb = BitBoard.from_board(board)
+    walled = bb.settled() and amazons27_part2.separated(bb)
+    if walled:
+        solved = len(amazons27_part2.side_regions(bb, bb.white) +
+                     amazons27_part2.side_regions(bb, bb.black))
+    else:
+        amazons27_part2.split_regions(bb)
+        area = amazons27_part2.search_area
+        solved = area is not None and len(amazons27_part2.sealed_groups(bb, True, area) +
+                                          amazons27_part2.sealed_groups(bb, False, area))
+    if not solved:
+        return {'walled': walled, 'solved': 0}
+    def work():
+        amazons27_part2.endgame_memo.clear()
+        if walled:
+            amazons27_part2.endgame_counts(bb)
+        else:
+            amazons27_part2.split_regions(bb)
+    try:
+        (calls, elapsed) = repeat(work, args.seconds)
+    except amazons27_part2.EndgameTooBig:
+        return {'walled': walled, 'solved': solved, 'too_big': True}
+    return {'walled': walled, 'solved': solved, 'seconds': elapsed, 'solves_per_sec': calls/elapsed}
+
+def run_one(bench, position, args):
+    # an amazons.book next to amazons27_part2 would answer the searches
+    amazons27_part2.USE_BOOK = False
+    board = load(position)
+    result = globals()['bench_' + bench](board, args)
+    result['peak_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+def commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the Amazons engine")
+    parser.add_argument('-b', '--bench', action='append', choices=BENCHMARKS,
+                        help="benchmark to run (default: all)")
+    parser.add_argument('-p', '--position', action='append', choices=sorted(CORPUS),
+                        help="position to run on (default: all)")
+    parser.add_argument('-s', '--seconds', type=float, default=1.0,
+                        help="least time to spend repeating each benchmark")
+    parser.add_argument('--search-time', type=int, default=4,
+                        help="time limit of the search benchmark's mcs116 call")
+    parser.add_argument('-o', '--output', default=None)
+    parser.add_argument('--one', nargs=2, metavar=('BENCH', 'POSITION'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print json.dumps(run_one(args.one[0], args.one[1], args))
+        return
+
+    results = {'commit': commit(), 'python': platform.python_version(),
+               'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': {}}
+    for bench in args.bench or BENCHMARKS:
+        results['results'][bench] = {}
+        for position in args.position or sorted(CORPUS):
+            cmd = [sys.executable, os.path.abspath(__file__), '--one', bench, position,
+                   '-s', str(args.seconds), '--search-time', str(args.search_time)]
+            results['results'][bench][position] = json.loads(subprocess.check_output(cmd))
+            sys.stderr.write("%s %s: %s\n" % (bench, position, results['results'][bench][position]))
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        out = open(args.output, 'w')
+        out.write(text + "\n")
+        out.close()
+    else:
+        print text
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# Build an opening book for mcs116 from offline searches.
+#
+#   python build_book.py setup.txt [-d plies] [-w width] [-t seconds] [-o book]
+#       [--side white|black|both] [--merge]
+#
+# mcs116 plays either side, so the book has lines for each (--side picks
+# one). For one side, starting from the setup file's position, the builder
+# searches every position with that side to move up to -d plies in, for -t
+# seconds each (a much longer search than a game allows), and puts the
+# move found and its score in the book. From each of these positions it
+# goes on after the book move; from the opponent's it goes on after the -w
+# replies that leave the book side's queens the least mobility -- the
+# replies the search itself expects. A position reached along more than
+# one line is searched once and its visits count how often it was reached.
+# With --merge the new positions are added to the book already in the
+# output file (their visits add up; the new move wins).
+#
+# The book is written in the format OpeningBook reads (see amazons27_part2),
+# by default to amazons.book next to amazons27_part2.py, where mcs116
+# looks for it.
+
+import argparse, os, sys, time
+
+import amazons27_part2
+from amazons27_part2 import (Amazons, BitBoard, OpeningBook, BOOK_FILE, BOOK_MAGIC,
+                             BOOK_RECORD, TIME_SAFETY, table)
+
+# key -> (move, score, visits), for every position of the book at path
+def read_book(path):
+    book = OpeningBook(path)
+    entries = {}
+    for i in range(len(book)):
+        (key, src, dst, adst, score, visits) = book.record(i)
+        entries[key] = (tuple([(x >> 4, x & 15) for x in (src, dst, adst)]), score, visits)
+    book.close()
+    return entries
+
+def write_book(path, entries):
+    tmp = path + '.tmp'
+    out = open(tmp, 'wb')
+    out.write(BOOK_MAGIC)
+    for key in sorted(entries):
+        (move, score, visits) = entries[key]
+        squares = [(r << 4) | c for (r, c) in move]
+        score = max(-32768, min(32767, score))
+        out.write(BOOK_RECORD.pack(key, squares[0], squares[1], squares[2], score, visits))
+    out.close()
+    os.rename(tmp, path)
+
+# the (move, score) mcs116 finds in bb's position with about seconds to think
+def search(bb, seconds):
+    board = bb.to_board()
+    board.time_limit = seconds / TIME_SAFETY
+    move = amazons27_part2.mcs116(board)
+    entry = table.probe(bb.key)
+    return (move, entry and entry[2] or 0)
+
+# the width replies of the side to move in bb's position that leave the
+# other side the least mobility
+def replies(bb, width):
+    scored = []
+    for m in bb.moves(bb.bWhite):
+        bb.make_move(m)
+        scored.append((bb.mobility(bb.queens(bb.bWhite)), m))
+        bb.unmake_move(m)
+    scored.sort()
+    return [m for (v, m) in scored[:width]]
+
+# the book positions with side (True: white) to move, added to entries
+def build(bb, side, plies, width, seconds, log, entries):
+    level = [(bb.white, bb.black, bb.arrows, bb.bWhite)]
+    for ply in range(plies):
+        following = []
+        for (white, black, arrows, bWhite) in level:
+            pos = BitBoard(bb.size, white, black, arrows, bWhite)
+            if pos.bWhite != side:
+                for m in replies(pos, width):
+                    pos.make_move(m)
+                    following.append((pos.white, pos.black, pos.arrows, pos.bWhite))
+                    pos.unmake_move(m)
+                continue
+            if pos.key in entries:
+                (move, score, visits) = entries[pos.key]
+                entries[pos.key] = (move, score, visits + 1)
+                continue
+            start = time.time()
+            (move, score) = search(pos, seconds)
+            if not move:
+                continue
+            entries[pos.key] = (move, score, 1)
+            log.write("%s ply %d: %s score %d (%.1fs), %d positions\n" % (
+                side and 'white' or 'black', ply, [amazons27_part2.rc2ld(x) for x in move],
+                score, time.time() - start, len(entries)))
+            pos.make_move(tuple([pos.bit(r, c) for (r, c) in move]))
+            following.append((pos.white, pos.black, pos.arrows, pos.bWhite))
+        level = following
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description="build an opening book for mcs116")
+    parser.add_argument('setup', help="setup file with the starting position")
+    parser.add_argument('-d', '--plies', type=int, default=4, help="plies deep to go")
+    parser.add_argument('-w', '--width', type=int, default=3, help="black replies to follow")
+    parser.add_argument('-t', '--seconds', type=float, default=60, help="seconds per search")
+    parser.add_argument('--side', choices=['white', 'black', 'both'], default='both',
+                        help="side to build the book for")
+    parser.add_argument('-o', '--output', default=BOOK_FILE)
+    parser.add_argument('--merge', action='store_true', help="add to the book in the output file")
+    args = parser.parse_args()
+
+    # the book being built must not answer its own searches
+    amazons27_part2.USE_BOOK = False
+    bb = BitBoard.from_board(Amazons(args.setup).board)
+    entries = {}
+    for side in (True, False):
+        if args.side in ('both', side and 'white' or 'black'):
+            build(bb, side, args.plies, args.width, args.seconds, sys.stderr, entries)
+    if args.merge and os.path.exists(args.output):
+        old = read_book(args.output)
+        for key in old:
+            if key in entries:
+                (move, score, visits) = entries[key]
+                entries[key] = (move, score, visits + old[key][2])
+            else:
+                entries[key] = old[key]
+    write_book(args.output, entries)
+    print "%d positions in %s" % (len(entries), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# Binary game records: many games in one compact file, and a replay engine
+# that streams the positions out of them.
+#
+#   python gamerecord.py convert results.jsonl games.amz
+#   python gamerecord.py replay games.amz [--check]
+#   python gamerecord.py show games.amz [-g game]
+#
+# A file is a run of games, each of them:
+#  * GAME_HEADER: GAME_MAGIC, the board size, the time limit, the lengths
+#    of the two player names, the number of white and black queens, the
+#    winner (0 white, 1 black), its margin and the number of turns
+#  * the white and black player names
+#  * the queens' squares at the start, white's first, a byte each
+#    (row<<4|column, as in the opening book)
+#  * one MOVE_RECORD per turn: the queen's square, its destination and the
+#    arrow's square (NO_SQUARE if the player gave none that fits), MOVE_MADE,
+#    MOVE_LOST or MOVE_RESIGNED, and the time the player took in
+#    hundredths of a second
+# A game is written from the record Amazons.play returns, so convert takes
+# the JSON lines tournament.py writes (and tournament.py -b writes games
+# straight to a record file).
+#
+# read_games yields the games of a file as GameRecords without making any
+# board; replay(game) then walks one BitBoard through it and yields the
+# position after every turn. replay prints the number of games and
+# positions and how fast they went by; --check also checks that every move
+# made was legal. show prints the moves of one game (or all).
+
+import argparse, collections, json, mmap, os, struct, sys, time
+
+from amazons27_part2 import BitBoard, ld2rc, rc2ld
+
+GAME_MAGIC = 'AMZG'
+GAME_HEADER = struct.Struct('<4sBHBBBBBBH')
+MOVE_RECORD = struct.Struct('<BBBBH')
+NO_SQUARE = 255
+MOVE_MADE = 0
+MOVE_LOST = 1
+MOVE_RESIGNED = 2
+
+# moves: a (src, dst, arrow, flag, seconds) tuple per turn, the squares
+# (row, column) or None
+GameRecord = collections.namedtuple('GameRecord',
+    'white black size time_limit white_queens black_queens winner margin moves')
+
+def square_byte(ld):
+    try:
+        (r, c) = ld2rc(ld)
+    except (TypeError, ValueError, IndexError):
+        return NO_SQUARE
+    if 0 <= r < 16 and 0 <= c < 16:
+        return (r << 4) | c
+    return NO_SQUARE
+
+def byte_square(b):
+    if b == NO_SQUARE:
+        return None
+    return (b >> 4, b & 15)
+
+# the bytes of one game, from the record Amazons.play returned
+def encode_game(record):
+    white = record['white'].encode('utf-8')[:255]
+    black = record['black'].encode('utf-8')[:255]
+    wqs = record['white_queens']
+    bqs = record['black_queens']
+    moves = record['moves']
+    parts = [GAME_HEADER.pack(GAME_MAGIC, record['size'], record['time_limit'], len(white),
+                              len(black), len(wqs), len(bqs), record['winner'] == 'black',
+                              min(record['margin'], 255), len(moves)),
+             white, black, ''.join([chr(square_byte(q)) for q in wqs + bqs])]
+    for (i, (p, move, seconds, made)) in enumerate(moves):
+        squares = [NO_SQUARE] * 3
+        if move and len(move) == 3:
+            squares = map(square_byte, move)
+        if made:
+            flag = MOVE_MADE
+        elif record['resigned'] and i == len(moves) - 1:
+            flag = MOVE_RESIGNED
+        else:
+            flag = MOVE_LOST
+        parts.append(MOVE_RECORD.pack(squares[0], squares[1], squares[2], flag,
+                                      min(int(round(seconds * 100)), 65535)))
+    return ''.join(parts)
+
+def decode_game(data, offset):
+    (magic, size, time_limit, nwhite, nblack, nwq, nbq, winner, margin, nmoves) = \
+        GAME_HEADER.unpack_from(data, offset)
+    if magic != GAME_MAGIC:
+        raise ValueError("no game at offset %d" % offset)
+    offset += GAME_HEADER.size
+    white = data[offset:offset + nwhite].decode('utf-8')
+    offset += nwhite
+    black = data[offset:offset + nblack].decode('utf-8')
+    offset += nblack
+    queens = [byte_square(ord(b)) for b in data[offset:offset + nwq + nbq]]
+    offset += nwq + nbq
+    moves = []
+    for i in range(nmoves):
+        (src, dst, adst, flag, centis) = MOVE_RECORD.unpack_from(data, offset)
+        moves.append((byte_square(src), byte_square(dst), byte_square(adst), flag, centis / 100.0))
+        offset += MOVE_RECORD.size
+    game = GameRecord(white, black, size, time_limit, queens[:nwq], queens[nwq:],
+                      winner and 'black' or 'white', margin, moves)
+    return (game, offset)
+
+# the games of the file at path, in order; the file is mapped, not read
+def read_games(path):
+    f = open(path, 'rb')
+    if not os.fstat(f.fileno()).st_size:
+        f.close()
+        return
+    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        offset = 0
+        while offset < len(data):
+            (game, offset) = decode_game(data, offset)
+            yield game
+    finally:
+        data.close()
+        f.close()
+
+# (turn, move, bb) after every turn of game, bb being the position then
+# (the same BitBoard every time, changed in place) and move the
+# (src, dst, arrow) made or None if the turn was lost. A resignation ends
+# the game without a position.
+def replay(game):
+    bb = BitBoard(game.size)
+    for (r, c) in game.white_queens:
+        bb.white |= bb.bit(r, c)
+    for (r, c) in game.black_queens:
+        bb.black |= bb.bit(r, c)
+    bb.key = bb.hash()
+    for (turn, (src, dst, adst, flag, seconds)) in enumerate(game.moves):
+        if flag == MOVE_RESIGNED:
+            return
+        if flag == MOVE_MADE:
+            move = (bb.bit(*src), bb.bit(*dst), bb.bit(*adst))
+            bb.make_move(move)
+            yield (turn, move, bb)
+        else:
+            # the other side plays next, with the same board
+            bb.bWhite = not bb.bWhite
+            bb.key ^= bb.zobrist[3]
+            yield (turn, None, bb)
+
+def convert(args):
+    out = open(args.output, 'ab')
+    count = skipped = 0
+    for line in open(args.input):
+        record = json.loads(line)
+        if 'error' in record or 'white_queens' not in record:
+            skipped += 1
+            continue
+        out.write(encode_game(record))
+        count += 1
+    out.close()
+    print "%d games written to %s, %d skipped" % (count, args.output, skipped)
+
+def replay_all(args):
+    start = time.time()
+    games = positions = 0
+    for game in read_games(args.record):
+        games += 1
+        for (turn, move, bb) in replay(game):
+            positions += 1
+            if args.check and move:
+                # take it back to look at the position it was played in
+                bb.unmake_move(move)
+                legal = bb.legal(move)
+                bb.make_move(move)
+                if not legal:
+                    print "game %d, turn %d: illegal move %s" % (games - 1, turn,
+                        [rc2ld(bb.rc(x)) for x in move])
+                    sys.exit(1)
+    elapsed = time.time() - start
+    print "%d games, %d positions in %.2fs (%.0f positions/s)" % (
+        games, positions, elapsed, positions / max(elapsed, 1e-9))
+
+def show(args):
+    for (i, game) in enumerate(read_games(args.record)):
+        if args.game is not None and i != args.game:
+            continue
+        print "game %d: %s (white) vs %s (black), %dx%d, %s wins by %d" % (
+            i, game.white, game.black, game.size, game.size, game.winner, game.margin)
+        for (turn, (src, dst, adst, flag, seconds)) in enumerate(game.moves):
+            squares = [x and rc2ld(x) or '?' for x in (src, dst, adst)]
+            note = {MOVE_MADE: '', MOVE_LOST: ' (lost the turn)', MOVE_RESIGNED: ' (resigned)'}[flag]
+            print "%3d %s-%s/%s %.2fs%s" % (turn, squares[0], squares[1], squares[2], seconds, note)
+
+def main():
+    parser = argparse.ArgumentParser(description="write and replay binary game records")
+    commands = parser.add_subparsers()
+    p = commands.add_parser('convert', help="append the games of a tournament's JSON lines")
+    p.add_argument('input')
+    p.add_argument('output')
+    p.set_defaults(run=convert)
+    p = commands.add_parser('replay', help="replay every game of a record file")
+    p.add_argument('record')
+    p.add_argument('--check', action='store_true', help="check every move made was legal")
+    p.set_defaults(run=replay_all)
+    p = commands.add_parser('show', help="print the moves of the games")
+    p.add_argument('record')
+    p.add_argument('-g', '--game', type=int, default=None, help="only this game (from 0)")
+    p.set_defaults(run=show)
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# Perft: count every legal move sequence of a given depth from a position,
+# to check the move generator and time it apart from any search.
+#
+#   python perft.py setup.txt depth [--divide] [--oracle | --check]
+#
+# The position is the start of the setup file, white to move. By default the
+# BitBoard generator (BitBoard.moves) does the counting; --oracle counts with
+# the referee's own Board primitives instead -- valid_path on every square
+# pair for the queen and then for the arrow, move_queen and shoot_arrow --
+# which is slow but independent of BitBoard. --check does both and stops at
+# the first root move whose counts differ. --divide prints the count below
+# each root move. The total, the time and leaves per second are printed at
+# the end.
+
+import argparse, os, sys, time
+
+from amazons27_part2 import Amazons, BitBoard, iter_bits, popcount, rc2ld
+
+# leaves below bb, depth plies deep; the last ply is counted in bulk, one
+# popcount per queen destination, instead of being generated
+def perft(bb, depth):
+    if depth == 1:
+        empty = bb.empty()
+        count = 0
+        for src in iter_bits(bb.queens(bb.bWhite)):
+            for dst in iter_bits(bb.targets(src, empty)):
+                count += popcount(bb.targets(dst, (empty|src)&~dst))
+        return count
+    count = 0
+    for m in list(bb.moves(bb.bWhite)):
+        bb.make_move(m)
+        count += perft(bb, depth-1)
+        bb.unmake_move(m)
+    return count
+
+# every legal move of the side to move on board, found with the referee's
+# valid_path (which prints why each rejected path is invalid)
+def oracle_moves(board):
+    size = len(board.config)
+    squares = [(r, c) for r in range(size) for c in range(size)]
+    queen = board.bWhite and 'Q' or 'q'
+    moves = []
+    for src in squares:
+        if board.config[src[0]][src[1]] != queen:
+            continue
+        for dst in squares:
+            if not board.valid_path(src, dst):
+                continue
+            board.move_queen(src, dst)
+            for adst in squares:
+                if board.valid_path(dst, adst):
+                    moves.append((src, dst, adst))
+            board.move_queen(dst, src)
+    return moves
+
+def oracle_perft(board, depth):
+    moves = oracle_moves(board)
+    if depth == 1:
+        return len(moves)
+    count = 0
+    for (src, dst, adst) in moves:
+        board.move_queen(src, dst)
+        board.shoot_arrow(adst)
+        board.bWhite = not board.bWhite
+        count += oracle_perft(board, depth-1)
+        board.bWhite = not board.bWhite
+        board.unmake_move((src, dst, adst))
+    return count
+
+def move_name(move):
+    return "%s-%s/%s" % tuple(map(rc2ld, move))
+
+def main():
+    parser = argparse.ArgumentParser(description="count the move sequences of a position")
+    parser.add_argument('setup', help="setup file with the position")
+    parser.add_argument('depth', type=int)
+    parser.add_argument('--divide', action='store_true', help="print the count of each root move")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--oracle', action='store_true', help="count with the Board primitives")
+    group.add_argument('--check', action='store_true', help="count both ways and compare")
+    args = parser.parse_args()
+    if args.depth < 1:
+        parser.error("depth must be at least 1")
+
+    board = Amazons(args.setup).board
+    bb = BitBoard.from_board(board)
+    # valid_path prints every rejected path
+    stdout = sys.stdout
+    quiet = open(os.devnull, 'w')
+
+    start = time.time()
+    total = 0
+    if args.oracle or args.check:
+        sys.stdout = quiet
+        roots = oracle_moves(board)
+        sys.stdout = stdout
+    else:
+        roots = [tuple(map(bb.rc, m)) for m in bb.moves(bb.bWhite)]
+    if args.check:
+        bitboard_roots = [tuple(map(bb.rc, m)) for m in bb.moves(bb.bWhite)]
+        if sorted(roots) != sorted(bitboard_roots):
+            print "root moves differ: %d from the oracle, %d from BitBoard" % (len(roots), len(bitboard_roots))
+            sys.exit(1)
+    for move in sorted(roots):
+        if args.depth == 1:
+            count = 1
+        elif args.oracle or args.check:
+            board.move_queen(move[0], move[1])
+            board.shoot_arrow(move[2])
+            board.bWhite = not board.bWhite
+            sys.stdout = quiet
+            count = oracle_perft(board, args.depth-1)
+            sys.stdout = stdout
+            board.bWhite = not board.bWhite
+            board.unmake_move(move)
+        else:
+            m = tuple(bb.bit(r, c) for (r, c) in move)
+            bb.make_move(m)
+            count = perft(bb, args.depth-1)
+            bb.unmake_move(m)
+        if args.check and args.depth > 1:
+            m = tuple(bb.bit(r, c) for (r, c) in move)
+            bb.make_move(m)
+            fast = perft(bb, args.depth-1)
+            bb.unmake_move(m)
+            if fast != count:
+                print "%s: %d from the oracle, %d from BitBoard" % (move_name(move), count, fast)
+                sys.exit(1)
+        if args.divide:
+            print "%s: %d" % (move_name(move), count)
+        total += count
+    elapsed = time.time() - start
+
+    print "depth %d: %d leaves in %.3fs (%.0f leaves/s)" % (args.depth, total, elapsed, total/max(elapsed, 1e-9))
+    if args.check:
+        print "the oracle and BitBoard agree"
+
+if __name__ == "__main__":
+    main()
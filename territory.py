@@ -0,0 +1,99 @@
+# Territory counting for many positions at once, with NumPy.
+#
+# Board.count_areas flood-fills one board at a time in pure python. For
+# offline analysis of large numbers of positions, count_areas_batch does
+# the same accounting for a whole stack of boards with array operations:
+#
+#   occ = stack_boards(boards)       # (N, size, size) occupancy codes
+#   scores = count_areas_batch(occ)  # (N, 2): the (w, b) of each board
+#
+# The occupancy codes are EMPTY, WHITE (a 'Q'), BLACK (a 'q') and ARROW.
+# The results are exactly those of count_areas, including its rules:
+# - a walled-off area with queens from one side belongs to that side
+# - a walled-off area with queens from both sides is neutral
+# - a walled-off area w/ no queens is deadspace
+# - with no neutral space left, only the winner's margin is returned
+
+import numpy as np
+
+EMPTY, WHITE, BLACK, ARROW = 0, 1, 2, 3
+CODES = {'.': EMPTY, 'Q': WHITE, 'q': BLACK, 'x': ARROW}
+
+# the 8 neighbours of a cell, as (row, column) offsets
+NEIGHBOURS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+# occupancy codes of one Board (or anything with a config grid)
+def board_array(board):
+    return np.array([[CODES[s] for s in row] for row in board.config], dtype=np.int8)
+
+def stack_boards(boards):
+    return np.array([board_array(b) for b in boards], dtype=np.int8)
+
+# the cells of a (N, size, size) array seen from each of the 8 neighbours,
+# with the outside of the board filled in with pad
+def _shifted(a, pad):
+    (n, size) = a.shape[:2]
+    padded = np.empty((n, size+2, size+2), dtype=a.dtype)
+    padded.fill(pad)
+    padded[:, 1:-1, 1:-1] = a
+    return [padded[:, 1+dr:size+1+dr, 1+dc:size+1+dc] for (dr, dc) in NEIGHBOURS]
+
+# label the 8-connected areas of empty cells: every empty cell ends up with
+# the flat index of the smallest empty cell of its area; other cells get
+# n*size*size
+def label_areas(empty):
+    (n, size) = empty.shape[:2]
+    none = n*size*size
+    labels = np.where(empty, np.arange(none).reshape(empty.shape), none)
+    flat = np.append(labels.ravel(), none)
+    while True:
+        # take the smallest label around each empty cell, then let every
+        # cell jump to the label of the cell its label points at
+        low = labels
+        for s in _shifted(labels, none):
+            low = np.minimum(low, s)
+        low = np.where(empty, low, none)
+        flat[:-1] = low.ravel()
+        low = flat[low]
+        flat[:-1] = low.ravel()
+        low = flat[low]
+        if np.array_equal(low, labels):
+            return labels
+        labels = low
+
+def count_areas_batch(occ):
+    occ = np.asarray(occ)
+    if occ.ndim == 2:
+        occ = occ[np.newaxis]
+    (n, size) = occ.shape[:2]
+    cells = size*size
+    empty = occ == EMPTY
+    labels = label_areas(empty)
+
+    # which queens each empty cell touches, collected per area
+    touch_w = np.zeros(empty.shape, dtype=bool)
+    touch_b = np.zeros(empty.shape, dtype=bool)
+    for s in _shifted(occ, EMPTY):
+        touch_w |= s == WHITE
+        touch_b |= s == BLACK
+    lab = labels[empty]
+    area_w = np.bincount(lab, weights=touch_w[empty], minlength=n*cells) > 0
+    area_b = np.bincount(lab, weights=touch_b[empty], minlength=n*cells) > 0
+
+    # classify every empty cell by its area and add them up per board
+    kind_w = np.zeros(n*cells, dtype=bool)
+    kind_b = np.zeros(n*cells, dtype=bool)
+    kind_n = np.zeros(n*cells, dtype=bool)
+    idx = np.flatnonzero(empty)
+    kind_w[idx] = area_w[lab] & ~area_b[lab]
+    kind_b[idx] = area_b[lab] & ~area_w[lab]
+    kind_n[idx] = area_w[lab] & area_b[lab]
+    wtot = kind_w.reshape(n, cells).sum(axis=1)
+    btot = kind_b.reshape(n, cells).sum(axis=1)
+    ntot = kind_n.reshape(n, cells).sum(axis=1)
+
+    # no neutral space left -- only the margin counts
+    settled = ntot == 0
+    w = np.where(settled, np.where(wtot > btot, wtot-btot, 0), wtot+ntot)
+    b = np.where(settled, np.where(wtot > btot, 0, btot-wtot), btot+ntot)
+    return np.column_stack((w, b)).astype(np.int64)
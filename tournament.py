@@ -0,0 +1,111 @@
+# Play many games between automatic players at once, without the boards.
+#
+#   python tournament.py -p mcs116 -p mcs116_mcts -s setup1.txt -s setup2.txt \
+#       -n 10 -o results.jsonl
+#
+# Every ordered pair of the players (so each plays both colors against each
+# other) plays every setup file n times; the setup files give the time limit
+# and the queens, their player lines are ignored. The games are spread over a
+# pool of worker processes (one per cpu unless -j says otherwise), and as
+# each game finishes its record from Amazons.play is written to the output
+# as one line of JSON, with the setup file, the game number and the random
+# seed (-r plus the game number) added (or an "error" instead of the result, if the game crashed or
+# ran past the -t limit -- two players that both keep losing their turns
+# would otherwise never finish). With -b the finished games are also
+# appended to a binary record file (see gamerecord.py). A win count per
+# player is printed at the end.
+
+import argparse, itertools, json, multiprocessing, os, random, signal, sys, traceback
+
+import amazons27_part2
+from gamerecord import encode_game
+
+def schedule(players, setups, repeat, limit, seed):
+    jobs = []
+    for (w, b) in itertools.permutations(players, 2):
+        for setup in setups:
+            for i in range(repeat):
+                jobs.append((len(jobs), setup, w, b, limit, seed + len(jobs)))
+    return jobs
+
+class GameTimeout(Exception):
+    pass
+
+def game_timeout(signum, frame):
+    raise GameTimeout()
+
+def play_game(job):
+    (game_id, setup, playerW, playerB, limit, seed) = job
+    random.seed(seed)
+    # the players and the move validation print too
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    signal.signal(signal.SIGALRM, game_timeout)
+    signal.alarm(limit)
+    try:
+        game = amazons27_part2.Amazons(setup, verbose=False)
+        (game.playerW, game.playerB) = (playerW, playerB)
+        record = game.play()
+    except GameTimeout:
+        record = {'white': playerW, 'black': playerB,
+                  'error': "game took longer than %d seconds" % limit}
+    except Exception:
+        record = {'white': playerW, 'black': playerB, 'error': traceback.format_exc()}
+    finally:
+        signal.alarm(0)
+        sys.stdout.close()
+        sys.stdout = stdout
+    record.update({'game': game_id, 'setup': setup, 'seed': seed})
+    return record
+
+def main():
+    parser = argparse.ArgumentParser(description="run a tournament between Amazons players")
+    parser.add_argument('-p', '--player', action='append', required=True,
+                        help="player function (give at least two)")
+    parser.add_argument('-s', '--setup', action='append', required=True,
+                        help="setup file (may be repeated)")
+    parser.add_argument('-n', '--repeat', type=int, default=1,
+                        help="games per pair, color and setup")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="worker processes (default: one per cpu)")
+    parser.add_argument('-t', '--timeout', type=int, default=600,
+                        help="seconds a game may take in all")
+    parser.add_argument('-r', '--seed', type=int, default=None,
+                        help="random seed of the first game (default: any)")
+    parser.add_argument('-o', '--output', default='results.jsonl')
+    parser.add_argument('-b', '--binary', default=None,
+                        help="binary record file to append the games to")
+    args = parser.parse_args()
+    if len(set(args.player)) < 2:
+        parser.error("need at least two different players")
+
+    if args.seed is None:
+        args.seed = random.randrange(1 << 30)
+    jobs = schedule(args.player, args.setup, args.repeat, args.timeout, args.seed)
+    wins = dict((p, 0) for p in args.player)
+    errors = 0
+    pool = multiprocessing.Pool(args.jobs or multiprocessing.cpu_count())
+    out = open(args.output, 'w')
+    binary = args.binary and open(args.binary, 'ab')
+    try:
+        for record in pool.imap_unordered(play_game, jobs):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            if 'error' in record:
+                errors += 1
+            else:
+                wins[record[record['winner']]] += 1
+                if binary:
+                    binary.write(encode_game(record))
+    finally:
+        out.close()
+        if binary:
+            binary.close()
+        pool.terminate()
+
+    print "%d games, %d errors" % (len(jobs), errors)
+    for p in args.player:
+        print "%s: %d wins" % (p, wins[p])
+
+if __name__ == "__main__":
+    main()